@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
-import argparse
+import concurrent.futures
 import os
+import queue
 import re
 import shlex
+import stat
+import tempfile
+import threading
 
 import gdb
 
@@ -11,24 +15,41 @@ import gdb
 # built-in extensions whitelist
 DEFAULT_EXTS: set[str] = {".debug", ".so", ".sym"}
 
-# avoid duplicates
-_loaded: set[str] = set()
+# directory names that never hold symbol files, pruned during the walk
+DEFAULT_PRUNE: set[str] = {".git", ".hg", ".svn", "__pycache__", "node_modules", "target"}
+
+# avoid duplicates, keyed by inode identity (st_dev, st_ino) so
+# symlinked or hardlinked copies of the same file collapse to one load
+_loaded: set[tuple[int, int]] = set()
 
 # gdb's error string for a permission failure looks like:
 #   "/path/to/file.debug: Permission denied"
 _PERM_RE = re.compile(r"(?P<path>/[^:]+): (?P<reason>Permission denied*)")
+_PERM_SUFFIX = ": Permission denied"
+
+# single-char substitution table; translate beats replace for this
+_BACKTICK_TRANS = str.maketrans({"`": "'"})
+
+# how many add-symbol-file commands are sourced per batch
+_BATCH_SIZE = 512
+
+# command usage; the argument list is small enough that a hand-rolled
+# parser in invoke() beats constructing an ArgumentParser per session
+_USAGE = """\
+usage: load-symbols [-h] [--ext EXT] [--prune PRUNE] [--show-unsupported] path
 
-# setup command info
-PARSER = argparse.ArgumentParser(
-    prog="load-symbols",
-    description="Recursively load all symbol files from a directory or load a single symbol file.",
-)
-PARSER.add_argument("path", help="Path to a symbol file or directory.")
-PARSER.add_argument(
-    "--ext",
-    help="Extra extensions, comma‑separated (e.g. --ext=.dbg,.elf)",
-    default="",
-)
+Recursively load all symbol files from a directory or load a single symbol file.
+
+positional arguments:
+  path           Path to a symbol file or directory.
+
+options:
+  -h, --help     show this help message and exit
+  --ext EXT      Extra extensions, comma‑separated (e.g. --ext=.dbg,.elf)
+  --prune PRUNE  Extra directory names to skip, comma‑separated (e.g. --prune=build,dist)
+  --show-unsupported
+                 Report files that were filtered out by extension.
+"""
 
 
 class Color:
@@ -41,106 +62,382 @@ class Color:
     RST = "\x1b[0m"
 
 
+# per-file line templates, composed once so the hot loop pays a single
+# %-substitution instead of re-interpolating the color constants each time
+_LOADED_FMT = f"{Color.GRE}Loaded {Color.PUR}'%s'{Color.RST}\n"
+_DENIED_FMT = f"{Color.RED}Permission denied: '%s'{Color.RST}\n\n"
+
+# line suffix shared by every Logger method, composed once
+_RST_NL = Color.RST + "\n"
+
+
 class Logger:
     @staticmethod
     def info(msg):
-        gdb.write(f"{Color.BLU}{msg}{Color.RST}\n")
+        gdb.write("".join((Color.BLU, msg, _RST_NL)))
 
     @staticmethod
     def warn(msg):
-        gdb.write(f"{Color.YEL}{msg}{Color.RST}\n")
+        gdb.write("".join((Color.YEL, msg, _RST_NL)))
 
     @staticmethod
     def error(msg):
-        gdb.write(f"{Color.RED}{msg}{Color.RST}\n")
+        gdb.write("".join((Color.RED, msg, _RST_NL)))
 
     @staticmethod
     def success(msg):
-        gdb.write(f"{Color.GRE}{msg}{Color.RST}\n")
+        gdb.write("".join((Color.GRE, msg, _RST_NL)))
+
+
+def seed_loaded_from_objfiles() -> None:
+    """
+    Sync _loaded with the objfiles GDB already knows about, so symbol
+    files added before this plugin was (re)sourced — or by other
+    scripts in the session — are never pushed through add-symbol-file
+    a second time.
+    """
+
+    fstat = os.stat
+    for objfile in gdb.objfiles():
+        filename = objfile.filename
+        if not filename:
+            continue
+        try:
+            st = fstat(filename)
+        except OSError:
+            continue
+        _loaded.add((st.st_dev, st.st_ino))
 
 
-def parse_extensions(s: str) -> tuple[str, ...]:
+def parse_extensions(s: str) -> tuple[tuple[str, ...], frozenset[str]]:
     """
     Combine DEFAULT_EXTS with a user‑supplied comma list.
     Ensures every entry starts with '.' and removes duplicates.
+    Returns the lowercased extensions both as a tuple (for endswith on
+    cold paths) and as a frozenset for O(1) suffix membership tests.
     """
 
     exts = set(DEFAULT_EXTS)
     for ext in map(str.strip, s.split(",")):
         if ext:
             exts.add(ext if ext.startswith(".") else "." + ext)
-    return tuple(ext.lower() for ext in exts)
+    lowered = tuple(ext.lower() for ext in exts)
+    return lowered, frozenset(lowered)
 
 
-def try_load(path: str) -> tuple[bool, str | None]:
+def parse_prune(s: str) -> frozenset[str]:
+    """Combine DEFAULT_PRUNE with a user‑supplied comma list."""
+
+    names = set(DEFAULT_PRUNE)
+    for name in map(str.strip, s.split(",")):
+        if name:
+            names.add(name)
+    return frozenset(names)
+
+
+def try_load(path: str, key: tuple[int, int] | None = None) -> tuple[bool, str | None]:
     """
     Attempt 'add-symbol-file <path>'.
-    Returns (success, error_message).
-    On success the file's realpath is recorded in _loaded.
+    Returns (success, error_message) and writes nothing itself, so the
+    caller can buffer or print the per-file line as it sees fit.
+    On success the file's inode key is recorded in _loaded; callers that
+    already statted the file pass *key* to skip the second stat.
     """
 
-    abs_path = os.path.realpath(path)
+    if key is None:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            return False, str(e)
+        key = (st.st_dev, st.st_ino)
+
+    if key in _loaded:
+        return False, f"Already loaded: '{path}'"
 
-    if abs_path in _loaded:
-        return False, f"Already loaded: '{abs_path}'"
+    # answer the common failure from errno instead of parsing GDB's
+    # localized error string after an expensive gdb.execute
+    if not os.access(path, os.R_OK):
+        return False, f"Permission denied: '{path}'"
 
     try:
-        gdb.execute(f"add-symbol-file {path}", to_string=True)
-        Logger.success(f"Loaded {Color.PUR}'{path}'")
-        _loaded.add(abs_path)
+        gdb.execute(f"add-symbol-file {shlex.quote(path)}", to_string=True)
+        _loaded.add(key)
         return True, None
     except gdb.error as e:
-        # normalise GDB error string and prettify permission error
-        msg = str(e).replace("`", "'")
-        m = _PERM_RE.match(msg)
-        if m:
-            msg = f"{m.group('reason')}: '{m.group('path')}'"
+        # normalise GDB error string and prettify permission error;
+        # a plain suffix test covers the common shape, the regex only
+        # runs for the odd variants
+        msg = str(e).translate(_BACKTICK_TRANS)
+        if msg.endswith(_PERM_SUFFIX):
+            msg = f"Permission denied: '{msg[: -len(_PERM_SUFFIX)]}'"
         else:
-            msg = f"{msg}"
+            m = _PERM_RE.match(msg)
+            if m:
+                msg = f"{m.group('reason')}: '{m.group('path')}'"
+        return False, msg
+
+
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+
+
+def advise_willneed(path: str) -> None:
+    """
+    Hint the kernel to start reading *path* (POSIX_FADV_WILLNEED) so the
+    upcoming add-symbol-file hits a warm page cache. The call only kicks
+    off readahead and returns immediately.
+    """
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+_tuned = False
+
+
+def tune_symbol_cache() -> None:
+    """
+    Enlarge GDB's symbol lookup cache once before the first big batch;
+    the default (1024 slots) thrashes when thousands of objfiles are
+    added. Best-effort: the maintenance knob varies across GDB versions.
+    """
+
+    global _tuned
+    if _tuned:
+        return
+    _tuned = True
+    try:
+        gdb.execute("maintenance set symbol-cache-size 4096", to_string=True)
+    except gdb.error:
+        pass
 
 
 def load_dir(
-    dir: str, exts: tuple[str, ...]
-) -> tuple[int, int, list[str], list[tuple[str, str]]]:
+    dir: str,
+    exts_set: frozenset[str],
+    prune: frozenset[str],
+    show_unsupported: bool = False,
+) -> tuple[int, int, list[str], int, list[tuple[str, str]]]:
     """
     Walk *directory* iteratively, call try_load() on every file
-    whose name ends with one of *exts*.
+    whose suffix is in *exts_set*, skipping subdirectories named
+    in *prune*. Filtered-out paths are only sampled when the caller
+    actually wants to report them (*show_unsupported*).
 
     Returns:
-        loaded         – number of files successfully loaded
-        skipped        – number of already‑loaded files skipped
-        unsupported    – paths filtered out by extension
-        failed         – list[(path, reason)] of add‑symbol‑file failures
+        loaded             – number of files successfully loaded
+        skipped            – number of already‑loaded files skipped
+        unsupported        – sample of paths filtered out by extension
+        unsupported_total  – total count of filtered paths
+        failed             – list[(path, reason)] of add‑symbol‑file failures
     """
 
     loaded = skipped = 0
-    denied: list[str] = []
+    unsupported_total = 0
+    # a set: deep unreadable subtrees can report the same parent many times
+    denied: set[str] = set()
+    # the reporter only ever shows a handful of these, so keep a small
+    # sample plus a counter instead of holding every rejected path
     unsupported: list[str] = []
     failed: list[tuple[str, str]] = []
 
-    def on_err(exc: OSError):
-        if isinstance(exc, PermissionError):
-            denied.append(exc.filename)
-
-    for root, _dirs, files in os.walk(dir, onerror=on_err):
-        for fname in files:
-            full_path = os.path.join(root, fname)
-            if fname.endswith(tuple(exts)):
-                if os.path.realpath(full_path) in _loaded:
-                    skipped += 1
-                else:
-                    ok, reason = try_load(full_path)
+    # extensions like '.so.1' span more than one dot, which the cheap
+    # rfind test can't see; bucket them by length so each distinct tail
+    # length costs one slice and one set lookup
+    buckets: dict[int, set[str]] = {}
+    for ext in exts_set:
+        if ext.count(".") > 1:
+            buckets.setdefault(len(ext), set()).add(ext)
+    bucket_items = tuple((length, frozenset(tails)) for length, tails in buckets.items())
+
+    def walk(root: str, split_dirs: list[str] | None = None):
+        # scandir gives us cached is_file()/is_dir() results straight from
+        # the directory read, so no extra stat per entry like os.walk does;
+        # an explicit stack avoids a Python frame per directory and keeps
+        # arbitrarily deep trees safe from RecursionError. With
+        # *split_dirs* the walk stops at the first level and parks the
+        # subdirectories there for the caller to fan out.
+        # bind the per-entry names to locals; LOAD_FAST beats the
+        # LOAD_GLOBAL/LOAD_ATTR chains on multi-100k-file trees
+        scandir = os.scandir
+        deny = denied.add
+        stack = [root]
+        push = stack.append if split_dirs is None else split_dirs.append
+        while stack:
+            try:
+                it = scandir(stack.pop())
+            except OSError as exc:
+                if isinstance(exc, PermissionError):
+                    deny(exc.filename)
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in prune:
+                                push(entry.path)
+                        # follow symlinks here: libfoo.so -> libfoo.so.1
+                        # is the normal shared-library layout, and the
+                        # inode dedup collapses symlinked duplicates
+                        elif entry.is_file():
+                            name = entry.name
+                            dot = name.rfind(".")
+                            matched = dot > 0 and name[dot:].lower() in exts_set
+                            if not matched and bucket_items:
+                                lower = name.lower()
+                                for length, tails in bucket_items:
+                                    if lower[-length:] in tails:
+                                        matched = True
+                                        break
+                            if matched:
+                                # DirEntry.stat caches, so the dedup key
+                                # costs at most one syscall right here
+                                try:
+                                    st = entry.stat()
+                                except OSError as exc:
+                                    failed.append((entry.path, str(exc)))
+                                else:
+                                    yield entry.path, (st.st_dev, st.st_ino)
+                            else:
+                                # rejects are tallied per worker by the
+                                # caller; generators running in pool
+                                # threads must not mutate shared state
+                                yield entry.path, None
+                    except OSError as exc:
+                        if isinstance(exc, PermissionError):
+                            deny(exc.filename)
+
+    # buffered per-batch lines; one gdb.write per flushed batch instead
+    # of one per loaded file
+    buf: list[str] = []
+    batch: list[tuple[str, tuple[int, int]]] = []
+
+    def flush_batch() -> None:
+        """Source the pending add-symbol-file commands and emit output."""
+
+        nonlocal loaded
+        if batch:
+            try:
+                tmp = tempfile.NamedTemporaryFile(
+                    "w", prefix="load-symbols-", suffix=".gdb", delete=False
+                )
+                with tmp:
+                    tmp.writelines(
+                        f"add-symbol-file {shlex.quote(p)}\n" for p, _ in batch
+                    )
+                try:
+                    gdb.execute(f"source {tmp.name}", to_string=True)
+                finally:
+                    os.unlink(tmp.name)
+            except (gdb.error, OSError):
+                # the batch aborted somewhere; the prefix before the
+                # failing line is already materialized as objfiles, so
+                # sync _loaded first lest the replay add them twice
+                seed_loaded_from_objfiles()
+                # then redo file by file so each failure gets its own
+                # error message
+                for full_path, key in batch:
+                    if key in _loaded:
+                        loaded += 1
+                        buf.append(_LOADED_FMT % full_path)
+                        continue
+                    ok, reason = try_load(full_path, key)
                     if ok:
                         loaded += 1
+                        buf.append(_LOADED_FMT % full_path)
                     else:
                         failed.append((full_path, reason or "Unknown error"))
             else:
-                unsupported.append(full_path)
+                loaded += len(batch)
+                for full_path, key in batch:
+                    _loaded.add(key)
+                    buf.append(_LOADED_FMT % full_path)
+            batch.clear()
+        if buf:
+            gdb.write("".join(buf))
+            buf.clear()
+
+    # run the walk in a producer thread: scandir/stat release the GIL,
+    # so directory I/O overlaps with GDB parsing symbol files on this
+    # thread. gdb itself is not thread-safe, hence all gdb.execute and
+    # gdb.write calls stay on the invoking (consumer) side.
+    q: queue.Queue[tuple[str, tuple[int, int]] | None] = queue.Queue(
+        maxsize=2 * _BATCH_SIZE
+    )
 
-    for path in denied:
-        Logger.error(f"Permission denied: '{path}'\n")
+    def pump(d: str, split_dirs: list[str] | None = None) -> tuple[int, list[str]]:
+        # queue the matches — advising as they go, so the bounded queue
+        # doubles as the sliding readahead window — and tally rejects
+        # into worker-local state, returned for the producer to merge
+        total = 0
+        sample: list[str] = []
+        for path, key in walk(d, split_dirs):
+            if key is None:
+                total += 1
+                if show_unsupported and len(sample) < 5:
+                    sample.append(path)
+            else:
+                if _HAS_FADVISE:
+                    advise_willneed(path)
+                q.put((path, key))
+        return total, sample
 
-    return loaded, skipped, unsupported, failed
+    def produce() -> None:
+        nonlocal unsupported_total
+        try:
+            # handle the root level inline, then fan each top-level
+            # subdirectory out to its own worker so getdents latency
+            # overlaps across independent subtrees
+            subdirs: list[str] = []
+            tallies = [pump(dir, subdirs)]
+            if subdirs:
+                workers = min(8, os.cpu_count() or 1, len(subdirs))
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=workers
+                ) as pool:
+                    tallies.extend(pool.map(pump, subdirs))
+            # merge after the pool has drained; only this thread touches
+            # the shared counters, and the consumer reads them after join
+            for total, sample in tallies:
+                unsupported_total += total
+                for path in sample:
+                    if len(unsupported) < 5:
+                        unsupported.append(path)
+        finally:
+            q.put(None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    # stream candidates into bounded batches: output shows up while the
+    # scan is still running, memory stays O(batch) instead of O(tree),
+    # and an interrupt loses at most one batch of progress
+    queued: set[tuple[int, int]] = set()
+    mark_queued = queued.add
+    enqueue = batch.append
+    get = q.get
+    while (item := get()) is not None:
+        full_path, key = item
+        if key in _loaded or key in queued:
+            skipped += 1
+        else:
+            mark_queued(key)
+            enqueue((full_path, key))
+            if len(batch) >= _BATCH_SIZE:
+                flush_batch()
+    producer.join()
+
+    buf.extend(_DENIED_FMT % path for path in sorted(denied))
+    flush_batch()
+
+    return loaded, skipped, unsupported, unsupported_total, failed
 
 
 def report_failures(failed: list[tuple[str, str]]) -> None:
@@ -149,27 +446,29 @@ def report_failures(failed: list[tuple[str, str]]) -> None:
     if not failed:
         return
 
-    Logger.error(f"\nFailed to load {Color.CYA}{len(failed)}{Color.RED} file(s):")
-    for _path, reason in failed[:5]:
-        Logger.error(f"  {reason}")
-    Logger.error("")
+    # assemble the whole report and hand it to gdb's ui_file in one write
+    parts = [f"\n{Color.RED}Failed to load {Color.CYA}{len(failed)}{Color.RED} file(s):\n"]
+    parts.extend(f"  {reason}\n" for _path, reason in failed[:5])
+    parts.append("\n")
     if len(failed) > 5:
-        Logger.error(f"  ... and {Color.CYA}{len(failed) - 5}{Color.RED} more.")
+        parts.append(f"  ... and {Color.CYA}{len(failed) - 5}{Color.RED} more.\n")
+    parts.append(Color.RST)
+    gdb.write("".join(parts))
 
 
-def report_unsupportedr(unsupported: list[str]) -> None:
+def report_unsupported(unsupported: list[str], total: int) -> None:
     """Print a short summary of files ignored due to extension filter."""
 
-    if not unsupported:
+    if not total:
         return
 
     Logger.warn(
-        f"Skipped {Color.CYA}{len(unsupported)}{Color.YEL} unsupported file(s) (filtered by extension):"
+        f"Skipped {Color.CYA}{total}{Color.YEL} unsupported file(s) (filtered by extension):"
     )
-    for path in unsupported[:5]:
+    for path in unsupported:
         Logger.warn(f"  {Color.PUR}'{path}'")
-    if len(unsupported) > 5:
-        Logger.warn(f"  ... and {Color.CYA}{len(unsupported) - 5}{Color.YEL} more.")
+    if total > len(unsupported):
+        Logger.warn(f"  ... and {Color.CYA}{total - len(unsupported)}{Color.YEL} more.")
 
 
 class LoadSymbolsCommand(gdb.Command):
@@ -179,19 +478,62 @@ class LoadSymbolsCommand(gdb.Command):
         super().__init__("load-symbols", gdb.COMMAND_USER)
 
     def invoke(self, arg, from_tty):
-        try:
-            args = PARSER.parse_args(shlex.split(arg))
-        except SystemExit:
-            PARSER.print_help()
+        # plain whitespace split unless quoting is in play; spinning up a
+        # full shlex lexer is reserved for that case
+        if '"' in arg or "'" in arg or "\\" in arg:
+            tokens = shlex.split(arg)
+        else:
+            tokens = arg.split()
+
+        raw_path: str | None = None
+        ext_arg = prune_arg = ""
+        show_unsupported = False
+        it = iter(tokens)
+        for tok in it:
+            if tok in ("-h", "--help"):
+                gdb.write(_USAGE)
+                return
+            elif tok == "--show-unsupported":
+                show_unsupported = True
+            elif tok == "--ext":
+                ext_arg = next(it, "")
+            elif tok.startswith("--ext="):
+                ext_arg = tok[len("--ext=") :]
+            elif tok == "--prune":
+                prune_arg = next(it, "")
+            elif tok.startswith("--prune="):
+                prune_arg = tok[len("--prune=") :]
+            elif raw_path is None and not tok.startswith("-"):
+                raw_path = tok
+            else:
+                Logger.error(f"Unrecognized argument: '{tok}'")
+                gdb.write(_USAGE)
+                return
+
+        if raw_path is None:
+            gdb.write(_USAGE)
+            return
+
+        path = os.path.abspath(raw_path)
+        exts, exts_set = parse_extensions(ext_arg)
+        prune = parse_prune(prune_arg)
+        seed_loaded_from_objfiles()
 
-        path = os.path.abspath(args.path)
-        exts = parse_extensions(args.ext)
+        # one stat answers both the file and directory questions below
+        try:
+            mode = os.stat(path).st_mode
+        except OSError:
+            Logger.error(
+                f"Path is not a directory or does not exist: {Color.PUR}'{path}'"
+            )
+            return
 
         # single file
-        if os.path.isfile(path):
-            if path.endswith(exts):
+        if stat.S_ISREG(mode):
+            if path.lower().endswith(exts):
                 success, reason = try_load(path)
                 if success:
+                    gdb.write(_LOADED_FMT % path)
                     Logger.info(f"\nTotal loaded {Color.CYA}1{Color.BLU} symbol file.")
                 else:
                     Logger.error(f"{reason}")
@@ -200,18 +542,25 @@ class LoadSymbolsCommand(gdb.Command):
             return
 
         # not a dir
-        if not os.path.isdir(path):
+        if not stat.S_ISDIR(mode):
             Logger.error(
                 f"Path is not a directory or does not exist: {Color.PUR}'{path}'"
             )
             return
 
         # dir but no access at all
-        if not os.access(path, os.R_OK | os.X_OK):
+        if not os.access(
+            path,
+            os.R_OK | os.X_OK,
+            effective_ids=os.access in os.supports_effective_ids,
+        ):
             Logger.error(f"Permission denied: '{path}'")
             return
 
-        total, skipped, unsupported, failed = load_dir(path, exts)
+        tune_symbol_cache()
+        total, skipped, unsupported, unsupported_total, failed = load_dir(
+            path, exts_set, prune, show_unsupported
+        )
 
         if total:
             Logger.info(f"Total loaded {Color.CYA}{total}{Color.BLU} symbol files.")
@@ -223,7 +572,8 @@ class LoadSymbolsCommand(gdb.Command):
             Logger.warn(f"No symbol files were loaded from: {Color.PUR}'{path}'")
 
         report_failures(failed)
-        report_unsupportedr(unsupported)
+        if show_unsupported:
+            report_unsupported(unsupported, unsupported_total)
 
 
 # register with the current GDB session